@@ -1,9 +1,14 @@
 from .__metadata__ import (__name__, __author__, __credits__, __version__, 
                        __license__, __maintainer__, __email__)
-import datetime, secrets
-from functools import wraps
+import datetime, threading, time, os, base64, hashlib, hmac, importlib, weakref
+from collections import OrderedDict, deque
+from functools import wraps, lru_cache
+from contextlib import contextmanager
 from sqlalchemy import (
     func, 
+    update,
+    select,
+    bindparam,
     literal, 
     create_engine, 
     Column, 
@@ -13,6 +18,7 @@ from sqlalchemy import (
     Integer, 
     ForeignKey, 
     JSON,
+    Index,
 )
 from sqlalchemy.orm import (
     sessionmaker, 
@@ -21,28 +27,86 @@ from sqlalchemy.orm import (
     backref,
     declarative_base,
 )
-from sqlalchemy.exc import SQLAlchemyError
-from typing import Union, List, Dict, Any, Optional
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from typing import Union, List, Dict, Any, Optional, Callable
 
 
 
 LocalBase = declarative_base()
 
+def _hash_signature(signature:str) -> str:
+    """Returns the hex SHA-256 digest of a signature, which is what keys are looked up by."""
+    return hashlib.sha256(signature.encode('utf-8')).hexdigest()
+
+def _signatures_match(stored:str, given:str) -> bool:
+    """Compares a stored signature to a given one in constant time."""
+    return hmac.compare_digest(stored.encode('utf-8'), given.encode('utf-8'))
+
+# Hoisted for generate_key, which builds keys the same way as secrets.token_urlsafe
+_URANDOM = os.urandom
+_B64 = base64.urlsafe_b64encode
+
+# Dialects that support INSERT ... ON CONFLICT DO NOTHING, which lets write_key 
+# detect signature collisions without raising and handling an IntegrityError. The 
+# dialect modules are only imported once an engine needs them, since importing them 
+# all up front accounts for a sizeable share of this module's import time.
+_ON_CONFLICT_DIALECTS = {
+    'postgresql': 'sqlalchemy.dialects.postgresql',
+    'sqlite': 'sqlalchemy.dialects.sqlite',
+}
+
+# Maps each live engine to the names of the signing tables already created or upgraded on it, 
+# so repeat Signatures instances sharing an engine can skip the table existence probe. This is 
+# keyed on engines rather than URLs, so a new engine for the same database always checks again.
+_CREATED_TABLES = weakref.WeakKeyDictionary()
+
+def _chunks(items, size:int):
+    """Splits items into lists of at most size items each, eg. to keep IN (...) lists within bind parameter limits."""
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+# The Signing columns returned, in order, by get_key, get_all, and query_keys
+_KEY_FIELDS = ('signature', 'email', 'scope', 'active', 'timestamp', 'expiration', 'previous_key', 'rotated')
+
 def create_signing_class(Base=None, datetime_override=datetime.datetime.utcnow, email_foreign_key_mapping: None | str = None):
-    """Factory for the Signing class, which allows several overrides for customization"""
+    """
+    Factory for the Signing class, which allows several overrides for customization.
+
+    The table is indexed on email, previous_key, and (expiration, active), which are the 
+    columns used to filter keys in query_keys and rotate_keys. create_all will not add these 
+    indexes to an existing signing table, so existing deployments should add them with a 
+    migration, eg. in Alembic:
+
+        op.create_index('ix_signing_email', 'signing', ['email'])
+        op.create_index('ix_signing_previous_key', 'signing', ['previous_key'])
+        op.create_index('ix_signing_exp_active', 'signing', ['expiration', 'active'])
+
+    Keys are looked up by signature_hash, the hex SHA-256 digest of the signature, so that lookup 
+    time does not depend on how much of a guessed signature matches a real one. create_all will not 
+    add this column to an existing signing table either, so existing deployments should add it with 
+    a migration, and then call Signatures.backfill_signature_hashes once to fill it in:
+
+        op.add_column('signing', sa.Column('signature_hash', sa.String(64), nullable=True))
+        op.create_index('ix_signing_signature_hash', 'signing', ['signature_hash'], unique=True)
+    """
     if Base is None:
         Base = LocalBase
 
     class Signing(Base):
         __tablename__ = 'signing'
+        __table_args__ = (Index('ix_signing_exp_active', 'expiration', 'active'),)
         signature = Column(String(1000), primary_key=True)
+        # A fixed-width string, rather than a binary type, so that every backend can index it
+        signature_hash = Column(String(64), unique=True, index=True, nullable=True)
         
         # Allow users to map email as a foreign key, see
         # https://github.com/signebedi/sqlalchemy_signing/issues/16
         if isinstance(email_foreign_key_mapping, str):
-            email = Column(String(100), ForeignKey(email_foreign_key_mapping))
+            email = Column(String(100), ForeignKey(email_foreign_key_mapping), index=True)
         else:
-            email = Column(String(100)) 
+            email = Column(String(100), index=True)
 
         scope = Column(JSON())
         active = Column(Boolean)
@@ -52,7 +116,7 @@ def create_signing_class(Base=None, datetime_override=datetime.datetime.utcnow,
         expiration_int = Column(Integer, nullable=False, default=0)
         request_count = Column(Integer, default=0)
         last_request_time = Column(DateTime, default=datetime_override)
-        previous_key = Column(String(1000), ForeignKey('signing.signature'), nullable=True)
+        previous_key = Column(String(1000), ForeignKey('signing.signature'), index=True, nullable=True)
         rotated = Column(Boolean)
         # parent = db.relationship("Signing", remote_side=[signature]) # self referential relationship
         children = relationship('Signing', backref=backref('parent', remote_side=[signature])) # self referential relationship
@@ -119,15 +183,110 @@ class AlreadyRotated(Exception):
     pass
 
 
+@contextmanager
+def no_expire_on_commit(session):
+    """
+    Temporarily stops a session from expiring its loaded instances when it commits, which 
+    would otherwise force a reload of every attribute accessed after the commit.
+
+    Args:
+        session (Session): The session to change.
+    """
+
+    old = session.expire_on_commit
+    session.expire_on_commit = False
+    try:
+        yield session
+    finally:
+        session.expire_on_commit = old
+
+
+def request_limiter(func):
+    """
+    A decorator that wraps a Signatures method with rate limiting logic. The wrapped method 
+    must take the signature being used as its first argument after self.
+
+    If rate limiting is enabled in the Signatures instance, this decorator checks the request count 
+    for the provided signature and raises a `RateLimitExceeded` exception if the count exceeds 
+    the max requests allowed in a set time period. 
+
+    If the time period has passed since the last request, it resets the request count. If the request 
+    count is within limits, it increments the request count and updates the time of the last request.
+
+    If the 'memory' rate limiting backend is selected, request counts are tracked in-process 
+    and only periodically written back to the database, see `Signatures.flush_rate_limits`.
+
+    If rate limiting is not enabled, the decorator simply calls the original function.
+
+    Args:
+        func (Callable): The function to wrap with rate limiting logic.
+
+    Returns:
+        wrapper (Callable): The wrapped function which now includes rate limiting logic.
+    """
+
+    @wraps(func)
+    def wrapper(self, signature, *args, **kwargs):
+
+        # If rate limiting has not been enabled, then we always return True
+        if not self.rate_limiting:
+            return func(self, signature, *args, **kwargs)
+
+        if self.rate_limiting_backend == 'memory':
+            self._limit_in_memory(signature)
+            return func(self, signature, *args, **kwargs)
+
+        with self.Session() as session:
+            # Look the key up by its hash and read only the rate limiting columns, 
+            # rather than loading the full row by the raw signature
+            signing_key = self._find_key(session, self._select_request_count, signature)
+
+            # Nonexistent keys are not counted
+            if signing_key:
+                request_counts = {}
+                self._limit_in_batch(signature, signing_key, request_counts)
+
+                count, last_request_time = request_counts[signature]
+                session.execute(self._update_request_count, [
+                    {'b_signature': signature, 'b_request_count': count, 'b_last_request_time': last_request_time}
+                ])
+                session.commit()
+
+        return func(self, signature, *args, **kwargs)
+
+    return wrapper
+
+
 class Signatures:
     """
     The Signatures class handles operations related to the creation, management, and validation 
     of signing keys in the database.
     """
+
+    # The number of times write_key will regenerate a key after a primary key collision
+    WRITE_KEY_ATTEMPTS = 5
+
+    # The number of keys, and the number of seconds for which each key, is cached by get_key
+    KEY_CACHE_SIZE = 1024
+    KEY_CACHE_TTL = 1.0
+
+    # The expiration stored for keys that never expire
+    _NO_EXPIRY = datetime.datetime(9999, 12, 31, 23, 59, 59)
+
+    # The number of signatures whose request counts are held in memory by the 'memory' 
+    # rate limiting backend before the least recently used entries are evicted
+    RATE_LIMIT_CACHE_SIZE = 10000
+
+    # The number of keys given a signature_hash per statement by backfill_signature_hashes
+    BACKFILL_BATCH_SIZE = 1000
+
+    # The most values bound into a single IN (...) list. Batches are split into chunks of this size to 
+    # stay well within database bind parameter limits, eg. 999 on SQLite before 3.32 and 65535 on PostgreSQL.
+    IN_CHUNK_SIZE = 500
     
     def __init__(
         self, 
-        db_uri:str, 
+        db_uri:str=None, 
         safe_mode:bool=True, 
         byte_len:int=24, 
         rate_limiting=False, 
@@ -137,17 +296,48 @@ class Signatures:
         Base=LocalBase,
         Signing=Signing,
         create_tables=True, # If True, this will run create_all on the database tables
+        echo:bool=False,
+        pool_size:int=5,
+        max_overflow:int=10,
+        pool_pre_ping:bool=True,
+        rate_limiting_backend:str='db',
+        rate_limiting_flush_interval=datetime.timedelta(seconds=10),
+        scoped:bool=True,
+        session_factory:Optional[Callable]=None,
+        engine=None,
+        unhashed_key_fallback:bool=False,
     ):
         """
         Initializes a new instance of the Signatures class.
 
         Args:
-            db_uri (str): A database URI to add the signing table to.
+            db_uri (str): A database URI to add the signing table to. Required unless an engine is passed.
             safe_mode (bool, optional): If safe_mode is enabled, we will prevent rotation of disabled or rotated keys. Defaults to True.
             byte_len (int, optional): The length of the generated signing keys. Defaults to 24.
             rate_limiting (bool, optional): If rate_limiting is enabled, we will impose key-by-key rate limits. Defaults to False.
             rate_limiting_max_requests (int, optional): Maximum allowed requests per time period.
             rate_limiting_period (datetime.timedelta, optional): Time period for rate limiting. Defaults to 1 hour.
+            echo (bool, optional): If echo is enabled, SQLAlchemy will log every statement it emits. Defaults to False.
+            pool_size (int, optional): The number of connections to keep open in the connection pool. Defaults to 5.
+            max_overflow (int, optional): The number of connections allowed beyond pool_size. Defaults to 10.
+            pool_pre_ping (bool, optional): If enabled, connections are tested for liveness on checkout. Defaults to True.
+            rate_limiting_backend (str, optional): Where request counts are tracked, either 'db' to read and write them on 
+                every request, or 'memory' to track them in-process over sliding windows and periodically flush them to the database. Defaults to 'db'.
+            rate_limiting_flush_interval (datetime.timedelta, optional): How often the 'memory' backend writes request counts 
+                back to the database. Defaults to 10 seconds.
+            scoped (bool, optional): If scoped is enabled, sessions are managed by a thread-local scoped_session. Disable it 
+                when sessions are already request-local, eg. in async frameworks. Defaults to True.
+            session_factory (Callable, optional): A session factory to use instead of building one, eg. a sessionmaker 
+                that your application already manages. Takes precedence over scoped. Defaults to None.
+            engine (Engine, optional): An existing engine to use instead of creating one from db_uri, in which case 
+                echo and the pool arguments are ignored. Defaults to None.
+            create_tables (bool, optional): If enabled, the signing table is created, or upgraded, if needed. This is 
+                only checked once per engine, so if you drop the table and then reuse the same engine, call 
+                Signatures.forget_created_tables(engine) first. Defaults to True.
+            unhashed_key_fallback (bool, optional): If enabled, keys that have no signature_hash yet are looked up by their 
+                signature instead, and backfilled when found. Enable this only while migrating a table from before 
+                signature_hash existed, since it adds a lookup by signature to every miss. It is switched off once 
+                backfill_signature_hashes finds no keys left to backfill. Defaults to False.
         """
 
         # if not Base:
@@ -156,15 +346,72 @@ class Signatures:
         #     self.Base = Base
         # self.Base = declarative_base()
 
-        self.Signing = self.get_model()
+        # Resolve the model once, rather than on every call in the hot paths
+        self._model = Signing
+        self.Signing = self._model
+        self._key_columns = tuple(getattr(Signing, field) for field in _KEY_FIELDS)
+
+        # Build the statements used on the hot lookup paths once, with the signature's hash as a 
+        # bind parameter, so each call reuses the same statement rather than constructing a new query. 
+        # Each is paired with a fallback for keys whose hash has not been backfilled, see _find_key.
+        self._select_key = self._lookup_statements(*self._key_columns)
+        self._select_key_status = self._lookup_statements(Signing.signature, Signing.active, Signing.expiration, Signing.scope)
+        self._select_request_count = self._lookup_statements(Signing.signature, Signing.request_count, Signing.last_request_time)
+
+        self._update_signature_hash = (
+            update(Signing.__table__)
+            .where(Signing.__table__.c.signature == bindparam('b_signature'))
+            .values(signature_hash=bindparam('b_signature_hash'))
+        )
+
+        # Executed with a list of parameters to write many request counts at once. We use a Core 
+        # executemany rather than bulk_update_mappings, so that keys deleted since their counts 
+        # were read are skipped instead of raising StaleDataError.
+        self._update_request_count = (
+            update(Signing.__table__)
+            .where(Signing.__table__.c.signature == bindparam('b_signature'))
+            .values(request_count=bindparam('b_request_count'), last_request_time=bindparam('b_last_request_time'))
+        )
+
+        if engine is not None:
+            self.engine = engine
+
+        elif db_uri is not None:
+            engine_kwargs = {'echo': echo, 'pool_pre_ping': pool_pre_ping}
+
+            # Pool sizing only applies to queue-based pools; in-memory SQLite, for 
+            # example, uses a SingletonThreadPool that rejects these arguments.
+            url = make_url(db_uri)
+            if issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+                engine_kwargs['pool_size'] = pool_size
+                engine_kwargs['max_overflow'] = max_overflow
+
+            self.engine = create_engine(db_uri, **engine_kwargs)
 
-        self.engine = create_engine(db_uri, echo=True)
-        self.Session = scoped_session(sessionmaker(bind=self.engine))
+        else:
+            raise ValueError("Either db_uri or engine must be provided.")
+
+        on_conflict_dialect = _ON_CONFLICT_DIALECTS.get(self.engine.dialect.name)
+        self._on_conflict_insert = importlib.import_module(on_conflict_dialect).insert if on_conflict_dialect else None
+
+        if session_factory is not None:
+            self.Session = session_factory
+        # Sessions are closed as soon as each operation finishes, so nothing is ever read 
+        # from an instance after its commit, and expiring instances on commit is wasted work
+        elif scoped:
+            self.Session = scoped_session(sessionmaker(bind=self.engine, expire_on_commit=False))
+        else:
+            self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
 
         # Create the table for Signing, without affecting existing tables
         # self.Base.metadata.create_all(self.engine, tables=[self.Signing.__table__])
         if create_tables:
-            Base.metadata.create_all(self.engine, tables=[self.Signing.__table__])
+            created = _CREATED_TABLES.setdefault(self.engine, set())
+            table_name = self.Signing.__table__.fullname
+
+            if table_name not in created:
+                Base.metadata.create_all(self.engine, tables=[self.Signing.__table__])
+                created.add(table_name)
 
 
         self.byte_len = byte_len
@@ -177,65 +424,284 @@ class Signatures:
         self.rate_limiting_max_requests = rate_limiting_max_requests
         self.rate_limiting_period = rate_limiting_period
 
+        if rate_limiting_backend not in ('db', 'memory'):
+            raise ValueError("rate_limiting_backend must be one of 'db' or 'memory'.")
+        self.rate_limiting_backend = rate_limiting_backend
+        self.rate_limiting_flush_interval = rate_limiting_flush_interval
+
         self.datetime_override = datetime_override
 
-    class request_limiter:
-        """
-        A descriptor class that wraps a function with rate limiting logic. This descriptor is meant to 
-        be used as a decorator for methods in the Signatures class.
+        # Whether to fall back to looking keys up by signature when nothing matches their hash, see _find_key
+        self._has_unhashed_keys = unhashed_key_fallback
 
-        If rate limiting is enabled in the Signatures instance, this decorator checks the request count 
-        for the provided signature and raises a `RateLimitExceeded` exception if the count exceeds 
-        the max requests allowed in a set time period. 
+        # Recently read keys, mapping signatures to (monotonic cache expiry, key details), see get_key
+        self._key_cache = OrderedDict()
 
-        If the time period has passed since the last request, it resets the request count. If the request 
-        count is within limits, it increments the request count and updates the time of the last request.
+        # In-memory rate limiting state, mapping signatures to deques of their request times, 
+        # in monotonic nanoseconds, within the last rate_limiting_period, oldest first
+        self._counters = OrderedDict()
+        self._rl_dirty = {}
+        self._rl_lock = threading.Lock()
 
-        If rate limiting is not enabled, the descriptor simply calls the original function.
+        # The memory backend does its window arithmetic on integer nanoseconds from a monotonic 
+        # clock, which is much cheaper than datetime arithmetic on every request
+        self._now_ns = time.monotonic_ns
+        self._period_ns = int(rate_limiting_period.total_seconds() * 1e9)
+        self._flush_interval_ns = int(rate_limiting_flush_interval.total_seconds() * 1e9)
+        self._rl_last_flush_ns = self._now_ns()
+
+        # The monotonic clock, in seconds, that get_key's cache expiry is measured against.
+        # Like _now_ns, tests can swap it for a fake clock rather than sleeping.
+        self._now = time.monotonic
+
+    @staticmethod
+    def forget_created_tables(engine=None) -> None:
+        """
+        Forgets which signing tables have been created on an engine, or on every engine if none is given, 
+        so that the next Signatures instance created with create_tables checks for its table again.
 
         Args:
-            func (Callable): The function to wrap with rate limiting logic.
+            engine (Engine, optional): The engine whose tables were dropped. Defaults to None.
+        """
+        if engine is None:
+            _CREATED_TABLES.clear()
+        else:
+            _CREATED_TABLES.pop(engine, None)
+
+    def _lookup_statements(self, *columns) -> tuple:
+        """
+        Builds a pair of statements selecting columns for one key: the first by signature_hash, 
+        and the second by signature, for keys whose signature_hash has not been backfilled yet.
+        """
+        Signing = self._model
+
+        return (
+            select(*columns).where(Signing.signature_hash == bindparam('sig_hash')),
+            select(*columns).where(Signing.signature == bindparam('signature'), Signing.signature_hash.is_(None)),
+        )
+
+    def _find_key(self, session, statements:tuple, signature:str):
+        """
+        Runs a pair of statements from _lookup_statements for a signature, returning the matching row or None.
+
+        Keys are looked up by the hash of their signature. Keys written by older versions of this 
+        library, or by processes that have not been upgraded yet, have no hash, so while the 
+        unhashed_key_fallback is enabled, if nothing matches the hash we fall back to the signature 
+        itself, and backfill the hash of any key found that way.
+        """
+        # Anything but a string, eg. a missing header passed through as None, can't be a key
+        if not isinstance(signature, str):
+            return None
+
+        row = session.execute(statements[0], {'sig_hash': _hash_signature(signature)}).first()
+        if row is not None:
+            return row if _signatures_match(row.signature, signature) else None
+
+        if not self._has_unhashed_keys:
+            return None
+
+        row = session.execute(statements[1], {'signature': signature}).first()
+        if row is not None:
+            self._backfill_hashes(session, [signature])
+
+        return row
+
+    def _backfill_hashes(self, session, signatures) -> None:
+        """Sets and commits the signature_hash of each of the given keys."""
+        session.execute(self._update_signature_hash, [
+            {'b_signature': signature, 'b_signature_hash': _hash_signature(signature)} for signature in signatures
+        ])
+        session.commit()
+
+    def backfill_signature_hashes(self) -> int:
+        """
+        Sets the signature_hash of every key that does not have one yet, eg. keys written by a version 
+        of this library from before keys were looked up by signature_hash.
+
+        This never changes the schema: add the signature_hash column and its index in a migration first, 
+        see create_signing_class, and then call this once. Keys missed by the backfill, such as those 
+        written by processes still running an older version, are only found if unhashed_key_fallback 
+        is enabled, which this switches off once it finds no keys left to backfill.
 
         Returns:
-            wrapper (Callable): The wrapped function which now includes rate limiting logic.
+            int: The number of keys whose signature_hash was set.
+        """
+        Signing = self._model
+
+        backfilled = 0
+
+        with self.Session() as session:
+            # Backfill in batches, so large tables are never read into memory at once
+            missing = select(Signing.signature).where(Signing.signature_hash.is_(None)).limit(self.BACKFILL_BATCH_SIZE)
+            while signatures := session.scalars(missing).all():
+                self._backfill_hashes(session, signatures)
+                backfilled += len(signatures)
+
+        # Every key now has a hash, so misses no longer need a second lookup by signature
+        self._has_unhashed_keys = False
+
+        return backfilled
+
+    def _limit_in_memory(self, signature:str) -> None:
+        """
+        Applies rate limiting to a signature using in-process sliding windows.
+
+        Each signature keeps a deque of the times of its requests within the last rate_limiting_period, 
+        so checking a limit only drops timed-out entries from the left and compares the deque's length. 
+        Windows are seeded from the database the first time a signature is seen, so that limits survive 
+        process restarts, and are then tracked entirely in memory: checking a limit never writes to the 
+        database. Changed counts are written back whenever the flush interval elapses or a key is 
+        expired or rotated.
+
+        Args:
+            signature (str): The signing key being used to make a request.
+
+        Raises:
+            RateLimitExceeded: If the number of requests with this signing key exceeds 
+            the maximum allowed within the specified time period.
+        """
+
+        seeded = None
+
+        while True:
+            now = self._now_ns()
+            window_start = now - self._period_ns
+
+            # Looking up, updating, and checking the window all happen under a single acquisition 
+            # of the lock, so the window can't be evicted or retired partway through a request
+            with self._rl_lock:
+                hits = self._counters.get(signature)
+
+                # An evicted window whose counts have not been flushed yet is still the current one
+                if hits is None:
+                    hits = self._rl_dirty.get(signature, seeded)
+                    if hits is not None:
+                        self._counters[signature] = hits
+
+                if hits is not None:
+                    self._counters.move_to_end(signature)
+
+                    # Drop requests that have slid out of the window
+                    while hits and hits[0] <= window_start:
+                        hits.popleft()
+
+                    # Check if request_count exceeds max_requests
+                    if len(hits) >= self.rate_limiting_max_requests:
+                        raise RateLimitExceeded("Too many requests. Please try again later.")
+
+                    hits.append(now)
+                    self._rl_dirty[signature] = hits
+
+                    # Evict the least recently used windows, making sure their counts still get written
+                    while len(self._counters) > self.RATE_LIMIT_CACHE_SIZE:
+                        self._counters.popitem(last=False)
+
+                    flush_due = now - self._rl_last_flush_ns >= self._flush_interval_ns or len(self._rl_dirty) > self.RATE_LIMIT_CACHE_SIZE
+                    break
+
+            # The signature has no window, so seed one from the database outside of 
+            # the lock, then try again. The second attempt always finds a window.
+            seeded = self._seed_window(signature)
+
+            # Nonexistent keys are not counted, just like the 'db' backend
+            if seeded is None:
+                return
+
+        if flush_due:
+            self.flush_rate_limits()
+
+    def _seed_window(self, signature:str) -> Optional[deque]:
+        """
+        Builds a sliding window for the 'memory' rate limiting backend from the request count 
+        stored in the database, or returns None if the key does not exist.
+        """
+
+        with self.Session() as session:
+            row = self._find_key(session, self._select_request_count, signature)
+
+        if not row:
+            return None
+
+        # Only the count and time of the latest request are stored, so we assume 
+        # that all of the stored requests happened at that time
+        seeded = deque()
+        if row.request_count and row.last_request_time:
+            age_ns = (self.datetime_override() - row.last_request_time) // datetime.timedelta(microseconds=1) * 1000
+            seeded.extend([self._now_ns() - age_ns] * row.request_count)
+
+        return seeded
+
+    def _retire_keys(self, signatures) -> None:
+        """
+        Forgets cached state for keys that have just been expired or rotated: drops them from 
+        the get_key cache and, for the 'memory' rate limiting backend, drops their windows and 
+        writes any pending counts to the database.
+        """
+
+        for signature in signatures:
+            self._key_cache.pop(signature, None)
+
+        if self.rate_limiting_backend != 'memory':
+            return
+
+        with self._rl_lock:
+            for signature in signatures:
+                self._counters.pop(signature, None)
+
+        self.flush_rate_limits()
+
+    def flush_rate_limits(self) -> None:
         """
+        Writes request counts tracked by the 'memory' rate limiting backend to the database.
 
-        def __init__(self, func):
-            self.func = func
+        This is called automatically once the flush interval has elapsed, but can also be 
+        called directly, for example when shutting down a process.
+        """
 
-        def __get__(self, instance, owner):
-            @wraps(self.func)
-            def wrapper(signature, *args, **kwargs):
+        # Request times are converted back to datetimes, relative to a single reading of both clocks
+        now = self.datetime_override()
 
-                # If rate limiting has not been enabled, then we always return True
-                if not instance.rate_limiting:
-                    return self.func(instance, signature, *args, **kwargs)
+        with self._rl_lock:
+            dirty, self._rl_dirty = self._rl_dirty, {}
+            now_ns = self._rl_last_flush_ns = self._now_ns()
 
-                Signing = instance.get_model()
+            params = [
+                {'b_signature': signature, 'b_request_count': len(hits), 'b_last_request_time': now - datetime.timedelta(microseconds=(now_ns - hits[-1]) // 1000)}
+                for signature, hits in dirty.items() if hits
+            ]
 
-                with instance.Session() as session:
-                    signing_key = session.query(Signing).filter_by(signature=signature).first()
+        if not params:
+            return
 
-                    # If the key does not exist
-                    if signing_key:
+        with self.Session() as session:
+            session.execute(self._update_request_count, params)
+            session.commit()
 
-                        # Reset request_count if period has passed since last_request_time
-                        if instance.datetime_override() - signing_key.last_request_time >= instance.rate_limiting_period:
-                            signing_key.request_count = 0
-                            signing_key.last_request_time = instance.datetime_override()
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _hours_delta(hours:int) -> datetime.timedelta:
+        """Returns a cached timedelta for a whole number of hours, as used for key expirations."""
+        return datetime.timedelta(hours=hours)
 
-                        # Check if request_count exceeds max_requests
-                        if signing_key.request_count >= instance.rate_limiting_max_requests:
-                            raise RateLimitExceeded("Too many requests. Please try again later.")
+    @staticmethod
+    def _normalize_scope(scope) -> List[str]:
+        """
+        Normalizes a scope argument into the lowercased list form that is stored in the database.
 
-                        # If limit not exceeded, increment request_count and update last_request_time
-                        signing_key.request_count += 1
-                        signing_key.last_request_time = instance.datetime_override()
+        Args:
+            scope (str, list, None): A single scope, an iterable of scopes, or None.
 
-                        session.commit()
+        Returns:
+            List[str]: The lowercased scopes, or an empty list if scope is None.
+        """
 
-                return self.func(instance, signature, *args, **kwargs)
-            return wrapper
+        if scope is None:
+            return []
+
+        if isinstance(scope, str):
+            return [scope.lower()]
+
+        return list(map(str.lower, scope))
 
     def generate_key(self, length:int=None) -> str:
         """
@@ -250,15 +716,31 @@ class Signatures:
             str: The generated signing key.
         """
 
-        if not length: 
-            length = self.byte_len
-        return secrets.token_urlsafe(length)
+        return _B64(_URANDOM(length or self.byte_len)).rstrip(b'=').decode('ascii')
+
+    def generate_keys(self, n:int) -> List[str]:
+        """
+        Generates n signing keys of byte_len bytes each, drawing the random bytes for 
+        the whole batch at once rather than once per key.
+
+        Args:
+            n (int): The number of keys to generate.
+
+        Returns:
+            List[str]: The generated signing keys. Keys are not checked for uniqueness.
+        """
+
+        length = self.byte_len
+        raw = _URANDOM(length * n)
+        return [_B64(raw[i:i + length]).rstrip(b'=').decode('ascii') for i in range(0, length * n, length)]
 
     def write_key(self, scope:str=None, expiration:int=0, active:bool=True, email:str=None, previous_key:str=None) -> str:
         """
         Writes a newly generated signing key to the database.
 
-        This function will continuously attempt to generate a key until a unique one is created. 
+        Rather than checking for an existing key before each insert, this function relies on the 
+        uniqueness of the signature primary key: if the insert collides with an existing key, a new 
+        key is generated and the insert is retried, up to a bounded number of attempts.
 
         Args:
             scope (str): The scope within which the signing key will be valid. Defaults to None.
@@ -270,40 +752,153 @@ class Signatures:
 
         Returns:
             str: The generated and written signing key.
+
+        Raises:
+            IntegrityError: If a unique key could not be written after the maximum number of attempts.
         """
-        Signing = self.get_model()
+        with self.Session() as session, session.begin():
+            key = self._write_key_in_session(
+                session, 
+                scope=scope, 
+                expiration=expiration, 
+                active=active, 
+                email=email, 
+                previous_key=previous_key,
+            )
 
-        with self.Session() as session:
-            # Generate a unique key
+        return key
+
+    def bulk_write_keys(self, specs:List[Dict[str, Any]]) -> List[str]:
+        """
+        Writes one newly generated signing key per spec to the database in a single transaction.
+
+        The keys are pre-generated and checked for collisions as a batch, then written with a
+        single executemany INSERT, which is far cheaper than calling write_key once per key.
+
+        Args:
+            specs (List[Dict[str, Any]]): One dict per key, each taking the same optional keyword
+                arguments as write_key: scope, expiration, active, email, and previous_key.
+
+        Returns:
+            List[str]: The generated signing keys, in the same order as specs.
+        """
+        if not specs:
+            return []
+
+        with self.Session() as session, session.begin():
+            signatures = self._generate_unique_keys(session, len(specs))
+
+            now = self.datetime_override()
+            rows = []
+
+            for signature, spec in zip(signatures, specs):
+                expiration = spec.get('expiration', 0)
+                email = spec.get('email')
+                rows.append({
+                    'signature': signature,
+                    'signature_hash': _hash_signature(signature),
+                    'scope': self._normalize_scope(spec.get('scope')),
+                    'email': email.lower() if email else "",
+                    'active': spec.get('active', True),
+                    'rotated': False,
+                    'expiration': (now + self._hours_delta(expiration)) if expiration else self._NO_EXPIRY,
+                    'expiration_int': expiration,
+                    'timestamp': now,
+                    'previous_key': spec.get('previous_key'),
+                })
+
+            session.execute(self._model.__table__.insert(), rows)
+
+        return signatures
+
+    def _write_key_in_session(self, session, scope:str=None, expiration:int=0, active:bool=True, email:str=None, previous_key:str=None) -> str:
+        """
+        Adds a newly generated signing key to an open session, without committing it, so that 
+        callers like rotate_key can write the new key in the same transaction as other changes.
+
+        On PostgreSQL and SQLite, collisions are detected with INSERT ... ON CONFLICT DO NOTHING. 
+        Elsewhere, each insert attempt runs in a savepoint, so a primary key collision only rolls 
+        back the attempt and not the rest of the caller's transaction. Arguments match write_key.
+
+        Returns:
+            str: The generated signing key.
+        """
+        Signing = self._model
+
+        # Prepare the data for the new key
+        signing_fields = {
+            'scope': self._normalize_scope(scope),
+            'email': email.lower() if email else "", 
+            'active': active,
+            'rotated': False,
+            'expiration': (self.datetime_override() + self._hours_delta(expiration)) if expiration else self._NO_EXPIRY,
+            'expiration_int': expiration,
+            'timestamp': self.datetime_override(),
+        }
+
+        if previous_key:
+            signing_fields['previous_key'] = previous_key
+
+        for attempt in range(self.WRITE_KEY_ATTEMPTS):
             key = self.generate_key()
-            
-            # Ensure the key is unique
-            while session.query(Signing).filter_by(signature=key).first() is not None:
-                key = self.generate_key()
-
-            # Prepare the data for the new key
-            signing_fields = {
-                'signature': key, 
-                'scope': [scope.lower()] if isinstance(scope, str) else [],
-                'email': email.lower() if email else "", 
-                'active': active,
-                'rotated': False,
-                'expiration': (self.datetime_override() + datetime.timedelta(hours=expiration)) if expiration else datetime.datetime(9999, 12, 31, 23, 59, 59),
-                'expiration_int': expiration,
-                'timestamp': self.datetime_override(),
-            }
-
-            if previous_key:
-                signing_fields['previous_key'] = previous_key
-
-            new_key = Signing(**signing_fields)
-            
-            session.add(new_key)
-            session.commit()
 
+            # Where the dialect supports it, a collision just inserts no rows, so we
+            # can skip both the savepoint and the exception handling below
+            if self._on_conflict_insert is not None:
+                stmt = (
+                    self._on_conflict_insert(Signing.__table__)
+                    .values(signature=key, signature_hash=_hash_signature(key), **signing_fields)
+                    .on_conflict_do_nothing(index_elements=['signature'])
+                )
+                if session.execute(stmt).rowcount:
+                    break
+
+                if attempt == self.WRITE_KEY_ATTEMPTS - 1:
+                    raise IntegrityError(str(stmt), None, Exception("Unable to generate a unique signing key."))
+                continue
+
+            try:
+                with session.begin_nested():
+                    session.add(Signing(signature=key, signature_hash=_hash_signature(key), **signing_fields))
+            except IntegrityError:
+                # A collision on a freshly generated key is astronomically unlikely, 
+                # so we only keep retrying for a handful of attempts before giving up.
+                if attempt == self.WRITE_KEY_ATTEMPTS - 1:
+                    raise
+            else:
+                break
 
         return key
 
+    def _generate_unique_keys(self, session, n:int) -> List[str]:
+        """
+        Generates n signing keys that are distinct from each other and from every key in the database.
+
+        Rather than checking each candidate separately, this checks the whole batch for collisions 
+        with a single SELECT ... WHERE signature IN (...), and only regenerates the colliding keys.
+
+        Args:
+            session (Session): An open session to check for existing keys with.
+            n (int): The number of keys to generate.
+
+        Returns:
+            List[str]: The generated signing keys.
+        """
+        Signing = self._model
+
+        keys = set()
+
+        while len(keys) < n:
+            candidates = set(self.generate_keys(n - len(keys))) - keys
+
+            if candidates:
+                existing = set()
+                for chunk in _chunks(candidates, self.IN_CHUNK_SIZE):
+                    existing.update(session.scalars(select(Signing.signature).where(Signing.signature.in_(chunk))))
+                keys.update(candidates - existing)
+
+        return list(keys)
+
     def expire_key(self, key):
         """
         Expires a signing key in the database.
@@ -318,24 +913,18 @@ class Signatures:
             bool: True indicating the success of the operation.
         """
 
-        Signing = self.get_model()
-
-        # Start a session
-        session = self.Session()
-
-        signing_key = session.query(Signing).filter_by(signature=key).first()
-        if not signing_key:
-            session.close()  # Ensure to close the session in case of early exit
-            raise KeyDoesNotExist("This key does not exist.")
+        Signing = self._model
 
-        # This will disable the key
-        signing_key.active = False
+        # The transaction commits when the block exits, and rolls back on any exception
+        with self.Session() as session, session.begin():
+            signing_key = session.get(Signing, key)
+            if not signing_key:
+                raise KeyDoesNotExist("This key does not exist.")
 
-        # Commit the change to the database
-        session.commit()
+            # This will disable the key
+            signing_key.active = False
 
-        # Close the session
-        session.close()
+        self._retire_keys([key])
 
         return True
     
@@ -390,40 +979,189 @@ class Signatures:
             bool: True if the signing key is valid and False otherwise.
         """
 
-        Signing = self.get_model()
+        Signing = self._model
 
         with self.Session() as session:
-            signing_key = session.query(Signing).filter_by(signature=signature).first()
+            # Only load the columns we check, rather than hydrating a full Signing instance
+            signing_key = self._find_key(session, self._select_key_status, signature)
+
+            # if the key doesn't exist
+            if not signing_key:
+                # return False
+                raise KeyDoesNotExist("This key does not exist.")
 
-        # if the key doesn't exist
-        if not signing_key:
-            # return False
-            raise KeyDoesNotExist("This key does not exist.")
+            try:
+                self._validate_key(signing_key, self._normalize_scope(scope))
+            except KeyExpired:
+                # if the signing key's expiration time has passed, we disable it using 
+                # the session we already have open rather than calling expire_key
+                if signing_key.active:
+                    session.execute(update(Signing).where(Signing.signature == signature).values(active=False))
+                    session.commit()
+                    self._key_cache.pop(signature, None)
+                raise
+
+        return True
+
+    def _validate_key(self, signing_key, scope:List[str]) -> None:
+        """
+        Checks that an existing signing key is active, unexpired, and matches a scope.
+
+        Args:
+            signing_key (Row): A row with the key's active, expiration, and scope columns.
+            scope (List[str]): The normalized scopes against which the signing key will be validated.
+
+        Raises:
+            KeyExpired: If the key is inactive or its expiration time has passed.
+            ScopeMismatch: If the key's scope doesn't match any of the required scopes.
+        """
 
         # if the signing key is set to inactive
         if not signing_key.active:
-            # return False
             raise KeyExpired("This key is no longer active.")
 
         # if the signing key's expiration time has passed
         if signing_key.expiration < self.datetime_override():
-            self.expire_key(signature)
-            # return False
             raise KeyExpired("This key is expired.")
 
-        # Convert scope to a list if it's a string
-        if isinstance(scope, str):
-            scope = [scope]
+        # if the signing key's scope doesn't match any of the required scopes. Key scopes 
+        # are usually tiny lists, where a membership scan beats building two sets.
+        key_scope = signing_key.scope or []
+        if key_scope:
+            if len(key_scope) > 8:
+                mismatch = frozenset(key_scope).isdisjoint(scope)
+            else:
+                mismatch = not any(s in key_scope for s in scope)
 
-        # if the signing key's scope doesn't match any of the required scopes
-        if signing_key.scope and not set(scope).intersection(set(signing_key.scope)):
-            raise ScopeMismatch("This key does not match the required scope.")
+            if mismatch:
+                raise ScopeMismatch("This key does not match the required scope.")
 
-        # # if the signing key's scope doesn't match the required scope
-        # if signing_key.scope != scope:
-        #     return False
+    def verify_keys(self, signatures:List[str], scope) -> List[Union[bool, Exception]]:
+        """
+        Verifies a batch of signing keys against a specific scope.
 
-        return True
+        This behaves like calling `verify_key` once per signature, in order, but reads every key 
+        with a single SELECT and writes all of the resulting changes - rate limit counters and 
+        newly expired keys - in a single transaction. Rate limits are still enforced per signature, 
+        so a signature that appears several times in the batch counts as several requests.
+
+        Rather than raising, the exception that `verify_key` would have raised for a signature is 
+        returned in its place, so one bad key does not prevent the rest of the batch from being checked.
+
+        Args:
+            signatures (List[str]): The signing keys to be verified.
+            scope (str): The scope against which the signing keys will be validated.
+
+        Returns:
+            List[Union[bool, Exception]]: For each signature, True if the key is valid, or the 
+            RateLimitExceeded, KeyDoesNotExist, KeyExpired, or ScopeMismatch exception describing 
+            why it is not.
+        """
+
+        Signing = self._model
+        scope = self._normalize_scope(scope)
+
+        results = []
+        request_counts = {}
+        expired = set()
+
+        select_keys = select(
+            Signing.signature, 
+            Signing.active, 
+            Signing.expiration, 
+            Signing.scope, 
+            Signing.request_count, 
+            Signing.last_request_time,
+        )
+
+        with self.Session() as session:
+            # Anything but a string can't be a key, so those are never looked up, see _find_key
+            lookups = {signature for signature in signatures if isinstance(signature, str)}
+
+            rows = {}
+            for chunk in _chunks({_hash_signature(signature) for signature in lookups}, self.IN_CHUNK_SIZE):
+                rows.update((row.signature, row) for row in session.execute(select_keys.where(Signing.signature_hash.in_(chunk))))
+
+            # Fall back to the signature for keys whose hash has not been backfilled, see _find_key
+            unhashed = lookups.difference(rows) if self._has_unhashed_keys else None
+            if unhashed:
+                legacy_rows = [
+                    row for chunk in _chunks(unhashed, self.IN_CHUNK_SIZE)
+                    for row in session.execute(select_keys.where(Signing.signature.in_(chunk), Signing.signature_hash.is_(None)))
+                ]
+                if legacy_rows:
+                    rows.update((row.signature, row) for row in legacy_rows)
+                    self._backfill_hashes(session, [row.signature for row in legacy_rows])
+
+            for signature in signatures:
+                signing_key = rows.get(signature) if isinstance(signature, str) else None
+
+                try:
+                    if self.rate_limiting and signing_key:
+                        if self.rate_limiting_backend == 'memory':
+                            self._limit_in_memory(signature)
+                        else:
+                            self._limit_in_batch(signature, signing_key, request_counts)
+
+                    if not signing_key:
+                        raise KeyDoesNotExist("This key does not exist.")
+
+                    try:
+                        self._validate_key(signing_key, scope)
+                    except KeyExpired:
+                        if signing_key.active:
+                            expired.add(signature)
+                        raise
+
+                except (RateLimitExceeded, KeyDoesNotExist, KeyExpired, ScopeMismatch) as e:
+                    results.append(e)
+                else:
+                    results.append(True)
+
+            if request_counts:
+                session.execute(self._update_request_count, [
+                    {'b_signature': signature, 'b_request_count': count, 'b_last_request_time': last_request_time}
+                    for signature, (count, last_request_time) in request_counts.items()
+                ])
+
+            for chunk in _chunks(expired, self.IN_CHUNK_SIZE):
+                session.execute(update(Signing).where(Signing.signature.in_(chunk)).values(active=False))
+
+            if request_counts or expired:
+                session.commit()
+
+        for signature in expired:
+            self._key_cache.pop(signature, None)
+
+        return results
+
+    def _limit_in_batch(self, signature:str, signing_key, request_counts:Dict[str, list]) -> None:
+        """
+        Applies the 'db' rate limiting backend's rules to one request, for request_limiter or a 
+        verify_keys batch, tracking counts in request_counts so they can be written back in a single statement.
+
+        Raises:
+            RateLimitExceeded: If the number of requests with this signing key exceeds 
+            the maximum allowed within the specified time period.
+        """
+
+        now = self.datetime_override()
+        entry = request_counts.get(signature)
+        if entry is None:
+            entry = request_counts[signature] = [signing_key.request_count or 0, signing_key.last_request_time or now]
+
+        # Reset request_count if period has passed since last_request_time
+        if now - entry[1] >= self.rate_limiting_period:
+            entry[0] = 0
+            entry[1] = now
+
+        # Check if request_count exceeds max_requests
+        if entry[0] >= self.rate_limiting_max_requests:
+            raise RateLimitExceeded("Too many requests. Please try again later.")
+
+        # If limit not exceeded, increment request_count and update last_request_time
+        entry[0] += 1
+        entry[1] = now
 
     def get_model(self):
 
@@ -439,9 +1177,6 @@ class Signatures:
             expiration (datetime): The date and time when the signing key is set to expire.
         """
 
-        if not hasattr(self, '_model'):
-            self._model = Signing
-
         return self._model
 
 
@@ -463,36 +1198,36 @@ class Signatures:
             or False if no keys are found.
         """
 
-        Signing = self.get_model()
+        Signing = self._model
 
-        with self.Session() as session:
-            query = session.query(Signing)
+        # A Core select returns plain rows, skipping the ORM's per-row instance bookkeeping
+        stmt = select(*self._key_columns)
 
-            if active is not None:
-                query = query.filter(Signing.active == active)
+        if active is not None:
+            stmt = stmt.where(Signing.active == active)
 
-            # Convert scope to a list if it's a string
-            if isinstance(scope, str):
-                scope = [scope]
+        # Convert scope to a lowercased list
+        scope = self._normalize_scope(scope)
 
-            if scope:
+        if scope:
 
-                for s in scope:
-                    # https://stackoverflow.com/a/44250678/13301284
-                    query = query.filter(Signing.scope.comparator.contains(s))
-                    
-            if email:
-                query = query.filter(Signing.email == email)
+            for s in scope:
+                # https://stackoverflow.com/a/44250678/13301284
+                stmt = stmt.where(Signing.scope.comparator.contains(s))
+                
+        if email:
+            stmt = stmt.where(Signing.email == email)
 
-            if previous_key:
-                query = query.filter(Signing.previous_key == previous_key)
+        if previous_key:
+            stmt = stmt.where(Signing.previous_key == previous_key)
 
-            result = query.all()
+        with self.Session() as session:
+            result = session.execute(stmt).all()
 
         if not result:
             raise Exception("No results found for given parameters.")
 
-        return [{'signature': key.signature, 'email': key.email, 'scope': key.scope, 'active': key.active, 'timestamp': key.timestamp, 'expiration': key.expiration, 'previous_key': key.previous_key, 'rotated': key.rotated} for key in result]
+        return [dict(row._mapping) for row in result]
 
     def get_all(self) -> List[Dict[str, Any]]:
 
@@ -504,7 +1239,9 @@ class Signatures:
             List[Dict[str, Any]]: A list of dictionaries where each dictionary contains the details of a signing key.
 
         """
-        return [{'signature': key.signature, 'email': key.email, 'scope': key.scope, 'active': key.active, 'timestamp': key.timestamp, 'expiration': key.expiration, 'previous_key': key.previous_key, 'rotated': key.rotated} for key in self.get_model().query.all()]
+        # Stream rows in batches, building each dict as we go, rather than fetching every row first
+        with self.Session() as session:
+            return [dict(zip(_KEY_FIELDS, row)) for row in session.execute(select(*self._key_columns).execution_options(yield_per=1000))]
 
 
     def get_key(self, signature:str) -> Dict[str, Any]:
@@ -513,6 +1250,10 @@ class Signatures:
         Query for a single key in the Signing table.
         If no keys are found, it returns an empty dict.
 
+        Found keys are cached for up to KEY_CACHE_TTL seconds, so repeated lookups of the same key 
+        skip the database. Expiring or rotating a key through this instance clears it from the cache, 
+        but changes made by other processes may take up to KEY_CACHE_TTL seconds to be seen.
+
         Args:
             signature (str): The signature you'd like to get.
 
@@ -521,15 +1262,28 @@ class Signatures:
 
         """
 
-        Signing = self.get_model()
+        cached = self._key_cache.get(signature)
+        if cached is not None:
+            if cached[0] > self._now():
+                return dict(cached[1])
+            self._key_cache.pop(signature, None)
 
         with self.Session() as session:
-            key = session.query(Signing).filter_by(signature=signature).first()
+            row = self._find_key(session, self._select_key, signature)
 
-        if key:
-            return {'signature': key.signature, 'email': key.email, 'scope': key.scope, 'active': key.active, 'timestamp': key.timestamp, 'expiration': key.expiration, 'previous_key': key.previous_key, 'rotated': key.rotated}
+        if not row:
+            return {}
 
-        return {}
+        key = dict(row._mapping)
+
+        # Cache the key briefly, but never past its own expiration
+        ttl = min((key['expiration'] - self.datetime_override()).total_seconds(), self.KEY_CACHE_TTL)
+        if ttl > 0:
+            self._key_cache[signature] = (self._now() + ttl, key)
+            while len(self._key_cache) > self.KEY_CACHE_SIZE:
+                self._key_cache.popitem(last=False)
+
+        return dict(key)
 
 
 
@@ -545,18 +1299,17 @@ class Signatures:
             List[Tuple[str, str]]: A list of tuples containing old keys and the new keys replacing them
         """
 
-        Signing = self.get_model()
+        Signing = self._model
 
         # get keys that will expire in the next time_until hours
-        with self.Session() as session:
+        with self.Session() as session, no_expire_on_commit(session):
             query = session.query(Signing).filter(
                 Signing.expiration <= (self.datetime_override() + datetime.timedelta(hours=time_until)),
                 Signing.active == True
             )
 
-            # Convert scope to a list if it's a string
-            if isinstance(scope, str):
-                scope = [scope]
+            # Convert scope to a lowercased list
+            scope = self._normalize_scope(scope)
 
             if scope:
 
@@ -564,16 +1317,54 @@ class Signatures:
                     # https://stackoverflow.com/a/44250678/13301284
                     query = query.filter(Signing.scope.comparator.contains(s))
 
-            expiring_keys = query.all()
+            # In safe mode, keys that have already been rotated should never produce further children
+            if self.safe_mode:
+                query = query.filter(Signing.rotated.isnot(True))
 
-            key_list = []
+            # Only load the columns needed to build the replacement keys
+            expiring_keys = query.with_entities(
+                Signing.signature, 
+                Signing.scope, 
+                Signing.email, 
+                Signing.expiration_int,
+            ).all()
+
+            if not expiring_keys:
+                return []
 
-            for key in expiring_keys:
+            # Pre-generate one unique replacement key per expiring key
+            new_signatures = self._generate_unique_keys(session, len(expiring_keys))
 
-                old_key = key.signature
-                new_key = self.rotate_key(key.signature)
+            now = self.datetime_override()
+            key_list = []
+            new_rows = []
+
+            for key, new_signature in zip(expiring_keys, new_signatures):
+                key_list.append((key.signature, new_signature))
+                new_rows.append({
+                    'signature': new_signature,
+                    'signature_hash': _hash_signature(new_signature),
+                    'scope': key.scope,
+                    'email': key.email,
+                    'active': True,
+                    'rotated': False,
+                    'expiration': (now + self._hours_delta(key.expiration_int)) if key.expiration_int else self._NO_EXPIRY,
+                    'expiration_int': key.expiration_int,
+                    'timestamp': now,
+                    'previous_key': key.signature,
+                })
+
+            # Disable all of the old keys and write their replacements in a single transaction
+            for chunk in _chunks([old_key for old_key, _ in key_list], self.IN_CHUNK_SIZE):
+                session.execute(
+                    update(Signing)
+                    .where(Signing.signature.in_(chunk))
+                    .values(active=False, rotated=True)
+                )
+            session.execute(Signing.__table__.insert(), new_rows)
+            session.commit()
 
-                key_list.append((old_key, new_key))
+        self._retire_keys([old_key for old_key, _ in key_list])
 
         # We may need to potentially modify the return behavior to provide greater detail ... 
         # for example, a list of old keys mapped to their new keys and emails.
@@ -590,12 +1381,12 @@ class Signatures:
             str: The new signing key.
         """
 
-        session = self.Session()
+        Signing = self._model
 
-        try:
-            Signing = self.get_model()
-
-            signing_key = session.query(Signing).filter_by(signature=key).first()
+        # Disabling the old key and writing the new one share a single transaction, which 
+        # commits when the block exits and rolls back on any exception
+        with self.Session() as session, no_expire_on_commit(session), session.begin():
+            signing_key = session.get(Signing, key)
 
             if not signing_key:
                 raise KeyDoesNotExist("This key does not exist.")
@@ -615,20 +1406,15 @@ class Signatures:
                 expiration = signing_key.expiration_int
 
             # Generate a new key with the same properties
-            new_key = self.write_key(
+            new_key = self._write_key_in_session(
+                session,
                 scope=signing_key.scope,
                 expiration=expiration,
                 active=True, 
                 email=signing_key.email,
                 previous_key=signing_key.signature,  # Assign old key's signature to the previous_key field of new key
             )
-            
-        except Exception as e:
-            session.rollback()  # Rollback in case of any exception
-            raise e
-        else:
-            session.commit()  # Commit if everything is fine
-        finally:
-            session.close()  # Ensure the session is closed in any case
+
+        self._retire_keys([key])
 
         return new_key
\ No newline at end of file
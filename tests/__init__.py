@@ -1,7 +1,17 @@
 import unittest
+import os
+import tempfile
+import base64
+import hashlib
+from dataclasses import dataclass
+from contextlib import contextmanager
+from unittest.mock import patch
+from collections import deque
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, event, inspect, text, update
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import StaticPool
 from sqlalchemy_signing import (
     Signatures, 
     RateLimitExceeded, 
@@ -10,19 +20,125 @@ from sqlalchemy_signing import (
     ScopeMismatch, 
     AlreadyRotated,
     LocalBase,
+    no_expire_on_commit,
 )
+
+@dataclass
+class LifecycleCase:
+    """A key lifecycle scenario: write a key, apply an action to it, then check that an operation fails."""
+    name: str
+    scope_write: str
+    scope_verify: str
+    action: Optional[str]  # 'expire', 'rotate', or 'forget' to check a key that was never written
+    operation: str  # 'verify' or 'rotate'
+    expected_exc: type
+
+CASES = [
+    LifecycleCase('scope_mismatch', 'test1', 'test2', None, 'verify', ScopeMismatch),
+    LifecycleCase('nonexistent_key', 'test', 'test', 'forget', 'verify', KeyDoesNotExist),
+    LifecycleCase('expired_key', 'test', 'test', 'expire', 'verify', KeyExpired),
+    LifecycleCase('rotate_already_rotated_key', 'test', 'test', 'rotate', 'rotate', AlreadyRotated),
+    LifecycleCase('rotate_inactive_key', 'test', 'test', 'expire', 'rotate', KeyExpired),
+]
+
+def create_memory_engine():
+    """Create an in-memory SQLite engine whose sessions all share one connection, and so one database."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    # Tests never need durability, so skip syncing and journaling on every commit
+    @event.listens_for(engine, "connect")
+    def _pragma(dbapi_conn, _):
+        cursor = dbapi_conn.cursor()
+        for pragma in ("synchronous=OFF", "journal_mode=MEMORY", "temp_store=MEMORY", "locking_mode=EXCLUSIVE"):
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+        # Stop pysqlite from managing transactions itself, so that SAVEPOINTs nest properly, see
+        # https://docs.sqlalchemy.org/en/20/dialects/sqlite.html#serializable-isolation-savepoints-transactional-ddl
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    return engine
+
+def memory_backend_signatures(max_requests=2):
+    """Create Signatures on a fresh in-memory database, rate limited by the 'memory' backend over a 10 second window."""
+    return Signatures(
+        engine=create_memory_engine(), 
+        rate_limiting=True, 
+        rate_limiting_max_requests=max_requests, 
+        rate_limiting_period=timedelta(seconds=10), 
+        rate_limiting_backend='memory',
+    )
+
+@contextmanager
+def capture_statements(engine):
+    """Collect the SQL of every statement executed on an engine within the block, in order."""
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+# Tests that never touch the database, and so can skip the per-test savepoint entirely
+READONLY = {'test_generate_key', 'test_generate_keys'}
+
 class TestSignatures(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Build a single in-memory database and Signatures instance for the whole class, rather 
+        # than rebuilding the engine and schema for each test. Everything runs inside one outer 
+        # transaction on one connection, and the library's sessions join it with savepoints.
+        cls.engine = create_memory_engine()
+        cls.connection = cls.engine.connect()
+        cls.transaction = cls.connection.begin()
+        LocalBase.metadata.create_all(cls.connection)
+        cls.signatures = Signatures(
+            engine=cls.engine, 
+            create_tables=False,
+            session_factory=scoped_session(sessionmaker(bind=cls.connection, join_transaction_mode='create_savepoint', expire_on_commit=False)),
+            rate_limiting=True, 
+            rate_limiting_max_requests=2, 
+            rate_limiting_period=timedelta(seconds=10),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.transaction.rollback()
+        cls.connection.close()
+        cls.engine.dispose()
+
     def setUp(self):
-        # Connect to an in-memory database for tests.
-        self.engine = create_engine('sqlite:///:memory:')
-        self.Session = scoped_session(sessionmaker(bind=self.engine))
-        # Create a new instance of Signatures for each test.
-        self.signatures = Signatures(db_uri='sqlite:///:memory:', rate_limiting=True, rate_limiting_max_requests=2, rate_limiting_period=timedelta(seconds=10))
+        self.savepoint = None if self._testMethodName in READONLY else self.connection.begin_nested()
 
     def tearDown(self):
-        # Drop all tables and close the session after each test.
-        LocalBase.metadata.drop_all(self.engine)
-        self.Session.remove()
+        if self.savepoint is None:
+            return
+
+        # Rolling back each test's savepoint discards its rows without any DDL or DELETEs.
+        self.signatures.Session.remove()
+        self.signatures._key_cache.clear()
+        self.savepoint.rollback()
+
+    def test_generate_key(self):
+        """Test that generated keys are url-safe and sized by byte_len."""
+        key = self.signatures.generate_key()
+        self.assertEqual(len(key), 32)
+        self.assertEqual(len(base64.urlsafe_b64decode(key + '==')), 24)
+        self.assertRegex(key, r'^[A-Za-z0-9_-]+$')
+        self.assertEqual(len(self.signatures.generate_key(length=48)), 64)
+
+    def test_generate_keys(self):
+        """Test that batch key generation draws distinct keys of the configured length."""
+        keys = self.signatures.generate_keys(100)
+        self.assertEqual(len(keys), 100)
+        self.assertEqual(len(set(keys)), 100)
+        self.assertTrue(all(len(key) == 32 for key in keys))
+        self.assertEqual(self.signatures.generate_keys(0), [])
 
     def test_key_generation_and_storage(self):
         """Test that a key can be generated, stored, and retrieved."""
@@ -31,12 +147,260 @@ class TestSignatures(unittest.TestCase):
         stored_key = self.signatures.get_key(key)
         self.assertEqual(stored_key['signature'], key)
 
-    def test_expire_key(self):
-        """Test expiring a key."""
+    def test_signature_hash_lookup(self):
+        """Test that keys are stored with, and looked up by, the hash of their signature."""
         key = self.signatures.write_key(scope='test', active=True)
-        self.assertTrue(self.signatures.expire_key(key))
+        with self.signatures.Session() as session:
+            stored = session.get(self.signatures.get_model(), key)
+            self.assertEqual(stored.signature_hash, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+        with capture_statements(self.engine) as statements:
+            self.assertEqual(self.signatures.get_key(key)['signature'], key)
+        selects = [statement for statement in statements if statement.startswith('SELECT')]
+        self.assertIn('signature_hash', selects[0].split('WHERE')[1])
+
+        # A near miss shares nothing with the real key's hash
+        near_miss = key[:-1] + ('A' if key[-1] != 'A' else 'B')
+        self.assertEqual(self.signatures.get_key(near_miss), {})
+        with self.assertRaises(KeyDoesNotExist):
+            self.signatures.verify_key(signature=near_miss, scope='test')
+
+    def test_missing_signature(self):
+        """Test that a None signature is rejected like a nonexistent key, rather than raising an unrelated error."""
+        key = self.signatures.write_key(scope='test', active=True)
+        memory_signatures = memory_backend_signatures()
+        for signatures in (self.signatures, memory_signatures):
+            for fallback in (False, True):
+                with self.subTest(backend=signatures.rate_limiting_backend, fallback=fallback), \
+                        patch.object(signatures, '_has_unhashed_keys', fallback):
+                    with self.assertRaises(KeyDoesNotExist):
+                        signatures.verify_key(None, 'test')
+                    self.assertEqual(signatures.get_key(None), {})
+                    results = signatures.verify_keys([None], 'test')
+                    self.assertIsInstance(results[0], KeyDoesNotExist)
+        results = self.signatures.verify_keys([None, key], 'test')
+        self.assertIsInstance(results[0], KeyDoesNotExist)
+        self.assertTrue(results[1])
+
+    def test_unhashed_keys_are_found_and_backfilled(self):
+        """Test that keys without a signature_hash are only found, and backfilled, while the fallback is enabled."""
+        Signing = self.signatures.get_model()
+        keys = [self.signatures.write_key(scope='test', active=True) for _ in range(4)]
+        with self.signatures.Session() as session:
+            session.execute(update(Signing).values(signature_hash=None))
+            session.commit()
+
+        # Without the fallback, a miss costs one lookup by hash in the limiter and one in check_key
+        with capture_statements(self.engine) as statements:
+            with self.assertRaises(KeyDoesNotExist):
+                self.signatures.verify_key(signature=keys[0], scope='test')
+        self.assertEqual(len([statement for statement in statements if statement.startswith('SELECT')]), 2)
+        self.assertEqual(self.signatures.get_key(keys[0]), {})
+
+        with patch.object(self.signatures, '_has_unhashed_keys', True):
+            self.assertEqual(self.signatures.get_key(keys[0])['signature'], keys[0])
+            self.assertTrue(self.signatures.verify_key(signature=keys[1], scope='test'))
+            self.assertEqual(self.signatures.verify_keys([keys[2], 'nonexistent'], scope='test')[0], True)
+            self.assertEqual(self.signatures.backfill_signature_hashes(), 1)
+            self.assertFalse(self.signatures._has_unhashed_keys)
+
+        with self.signatures.Session() as session:
+            for key in keys:
+                self.assertEqual(session.get(Signing, key).signature_hash, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def test_upgrade_table_without_signature_hash(self):
+        """Test that a signing table from before signature_hash existed works once migrated and backfilled."""
+        engine = create_memory_engine()
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE signing (signature VARCHAR(1000) PRIMARY KEY, email VARCHAR(100), scope JSON, "
+                "active BOOLEAN, timestamp DATETIME NOT NULL, expiration DATETIME NOT NULL, expiration_int INTEGER NOT NULL, "
+                "request_count INTEGER, last_request_time DATETIME, previous_key VARCHAR(1000) REFERENCES signing (signature), rotated BOOLEAN)"
+            ))
+            conn.execute(text(
+                "INSERT INTO signing (signature, email, scope, active, timestamp, expiration, expiration_int, request_count, last_request_time, rotated) "
+                "VALUES ('legacy-key', '', '[\"test\"]', 1, '2024-01-01 00:00:00.000000', '9999-12-31 23:59:59.000000', 0, 0, '2024-01-01 00:00:00.000000', 0)"
+            ))
+
+        # Creating an instance never changes an existing table's schema
+        signatures = Signatures(engine=engine, rate_limiting=True)
+        with engine.connect() as conn:
+            self.assertNotIn('signature_hash', {column['name'] for column in inspect(conn).get_columns('signing')})
+
+        # Apply the migration documented in create_signing_class, then backfill
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE signing ADD COLUMN signature_hash VARCHAR(64)"))
+            conn.execute(text("CREATE UNIQUE INDEX ix_signing_signature_hash ON signing (signature_hash)"))
+        self.assertEqual(signatures.backfill_signature_hashes(), 1)
+
+        self.assertTrue(signatures.verify_key(signature='legacy-key', scope='test'))
+        self.assertEqual(signatures.get_key('legacy-key')['scope'], ['test'])
+        key = signatures.write_key(scope='test', active=True)
+        self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+
+    def test_unscoped_sessions(self):
+        """Test that keys can be written and verified without a scoped_session."""
+        signatures = Signatures(engine=create_memory_engine(), scoped=False)
+        self.assertNotIsInstance(signatures.Session, scoped_session)
+        key = signatures.write_key(scope='test', active=True)
+        self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+
+    def test_create_tables_once_per_engine(self):
+        """Test that the signing table is only created once for each in-memory engine."""
+        engine = create_memory_engine()
+        Signatures(engine=engine)
+        with capture_statements(engine) as statements:
+            signatures = Signatures(engine=engine)
+        self.assertEqual(statements, [])
+        key = signatures.write_key(scope='test', active=True)
+        self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+
+    def test_recreate_dropped_table(self):
+        """Test that a dropped signing table is created again by a new instance for the same database."""
+        with tempfile.TemporaryDirectory() as directory:
+            db_uri = f"sqlite:///{os.path.join(directory, 'signing.db')}"
+            signatures = Signatures(db_uri)
+            LocalBase.metadata.drop_all(signatures.engine)
+            signatures.engine.dispose()
+
+            signatures = Signatures(db_uri)
+            key = signatures.write_key(scope='test', active=True)
+            self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+
+            # Reusing the same engine needs its created tables to be forgotten first
+            LocalBase.metadata.drop_all(signatures.engine)
+            Signatures.forget_created_tables(signatures.engine)
+            signatures = Signatures(engine=signatures.engine)
+            key = signatures.write_key(scope='test', active=True)
+            self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+            signatures.engine.dispose()
+
+    def test_no_expire_on_commit(self):
+        """Test that no_expire_on_commit restores the session's setting afterwards."""
+        session = sessionmaker(bind=self.engine, expire_on_commit=True)()
+        with no_expire_on_commit(session):
+            self.assertFalse(session.expire_on_commit)
+        self.assertTrue(session.expire_on_commit)
+        session.close()
+
+    def test_write_and_query_key(self):
+        """Test that written keys can be found with query_keys and get_all."""
+        key = self.signatures.write_key(scope='test', active=True, email='Test@example.com')
+        queried_keys = self.signatures.query_keys(active=True, email='test@example.com')
+        self.assertEqual(len(queried_keys), 1)
+        self.assertEqual(queried_keys[0]['signature'], key)
+        self.assertEqual(queried_keys[0]['scope'], ['test'])
+        self.assertEqual([k['signature'] for k in self.signatures.get_all()], [key])
+
+    def test_bulk_write_roundtrip(self):
+        """Test that bulk_write_keys writes every key in one call."""
+        keys = self.signatures.bulk_write_keys([{'scope': 'test', 'email': f'User{i}@example.com'} for i in range(1000)])
+        self.assertEqual(len(set(keys)), 1000)
+        queried_keys = self.signatures.query_keys(active=True)
+        self.assertEqual({k['signature'] for k in queried_keys}, set(keys))
+        self.assertEqual(self.signatures.get_key(keys[7])['email'], 'user7@example.com')
+        self.assertTrue(self.signatures.verify_key(signature=keys[0], scope='test'))
+        self.assertEqual(self.signatures.bulk_write_keys([]), [])
+
+    def test_in_lists_are_chunked(self):
+        """Test that batch operations split their IN (...) lists into chunks of IN_CHUNK_SIZE values."""
+        with patch.object(self.signatures, 'IN_CHUNK_SIZE', 3), capture_statements(self.engine) as statements:
+            keys = self.signatures.bulk_write_keys([{'scope': 'test', 'expiration': 1} for _ in range(10)])
+            results = self.signatures.verify_keys(keys + ['nonexistent'], scope='test')
+            rotated_keys = self.signatures.rotate_keys(time_until=2, scope='test')
+        self.assertEqual(results, [True] * 10 + [results[-1]])
+        self.assertIsInstance(results[-1], KeyDoesNotExist)
+        self.assertEqual({old_key for old_key, _ in rotated_keys}, set(keys))
+
+        in_lists = [statement.split(' IN (')[1].split(')')[0] for statement in statements if ' IN (' in statement]
+        self.assertTrue(in_lists)
+        self.assertLessEqual(max(in_list.count('?') for in_list in in_lists), 3)
+
+    def test_no_orm_hydration(self):
+        """Test that read paths only select the columns they return."""
+        key = self.signatures.write_key(scope='test', active=True)
+        with capture_statements(self.engine) as statements:
+            self.signatures.query_keys(active=True)
+            self.signatures.get_all()
+        selects = [statement for statement in statements if statement.startswith('SELECT')]
+        self.assertEqual(len(selects), 2)
+        for statement in selects:
+            selected = statement.split('FROM')[0]
+            self.assertIn('signing.signature', selected)
+            self.assertNotIn('request_count', selected)
+            self.assertNotIn('last_request_time', selected)
+
+    def test_write_key_retries_on_collision(self):
+        """Test that a colliding key is regenerated rather than overwritten."""
+        existing_key = self.signatures.write_key(scope='test', active=True)
+        # Exercise both the ON CONFLICT path and the savepoint fallback used by other dialects
+        for on_conflict_insert in (self.signatures._on_conflict_insert, None):
+            with self.subTest(on_conflict_insert=on_conflict_insert):
+                fresh_key = f'fresh_key_{on_conflict_insert is None}'
+                with patch.object(self.signatures, '_on_conflict_insert', on_conflict_insert), \
+                        patch.object(self.signatures, 'generate_key', side_effect=[existing_key, fresh_key]):
+                    key = self.signatures.write_key(scope='test', active=True)
+                self.assertEqual(key, fresh_key)
+                self.assertEqual(self.signatures.get_key(existing_key)['signature'], existing_key)
+
+    def test_generate_unique_keys_skips_existing(self):
+        """Test that batch key generation regenerates keys already in the database."""
+        existing_key = self.signatures.write_key(scope='test', active=True)
+        with patch.object(self.signatures, 'generate_keys', side_effect=[[existing_key, 'a'], ['a'], ['b']]):
+            with self.signatures.Session() as session:
+                keys = self.signatures._generate_unique_keys(session, 2)
+        self.assertEqual(sorted(keys), ['a', 'b'])
+
+    def test_get_key_cache(self):
+        """Test that repeat get_key lookups are cached until the key changes."""
+        key = self.signatures.write_key(scope='test', active=True)
+        self.assertTrue(self.signatures.get_key(key)['active'])
+
+        with capture_statements(self.engine) as statements:
+            self.assertTrue(self.signatures.get_key(key)['active'])
+        self.assertEqual(statements, [])
+
+        # Once the cache entry's TTL passes, the key is read from the database again
+        clock = [0.0]
+        with patch.object(self.signatures, '_now', lambda: clock[0]):
+            self.signatures._key_cache.clear()
+            self.signatures.get_key(key)
+            clock[0] += self.signatures.KEY_CACHE_TTL + 1
+            with capture_statements(self.engine) as statements:
+                self.assertTrue(self.signatures.get_key(key)['active'])
+        self.assertTrue(any(statement.startswith('SELECT') for statement in statements))
+
+        self.signatures.expire_key(key)
+        self.assertFalse(self.signatures.get_key(key)['active'])
+
+    def test_key_lifecycle(self):
+        """Test that verifying or rotating keys in invalid states raises the right exception."""
+        for case in CASES:
+            with self.subTest(case=case.name):
+                key = self.signatures.write_key(scope=case.scope_write, active=True)
+
+                if case.action == 'expire':
+                    self.assertTrue(self.signatures.expire_key(key))
+                elif case.action == 'rotate':
+                    self.assertNotEqual(self.signatures.rotate_key(key=key), key)
+                elif case.action == 'forget':
+                    key = 'nonexistent_key'
+
+                with self.assertRaises(case.expected_exc):
+                    if case.operation == 'verify':
+                        self.signatures.verify_key(signature=key, scope=case.scope_verify)
+                    else:
+                        self.signatures.rotate_key(key=key)
+
+    def test_verify_timed_out_key(self):
+        """Test that verifying a key past its expiration disables it."""
+        now = [datetime(2024, 1, 1)]
+        signatures = Signatures(engine=create_memory_engine(), datetime_override=lambda: now[0])
+        key = signatures.write_key(scope='test', expiration=1, active=True)
+        now[0] += timedelta(hours=2)
         with self.assertRaises(KeyExpired):
-            self.signatures.verify_key(signature=key, scope='test')
+            signatures.verify_key(signature=key, scope='test')
+        self.assertFalse(signatures.get_key(key)['active'])
 
     def test_rotate_key(self):
         """Test key rotation."""
@@ -46,6 +410,28 @@ class TestSignatures(unittest.TestCase):
         with self.assertRaises(KeyExpired):
             self.signatures.verify_key(signature=old_key, scope=['test'])
         self.assertTrue(self.signatures.verify_key(signature=new_key, scope=['test']))
+        self.assertEqual(self.signatures.get_key(new_key)['scope'], ['test'])
+        with self.assertRaises(ScopeMismatch):
+            self.signatures.verify_key(signature=new_key, scope=['other'])
+
+    def test_rotate_keys(self):
+        """Test bulk rotation of keys that are about to expire."""
+        # Pin the clock, so expirations can be checked exactly without depending on wall time
+        now = datetime(2024, 1, 1)
+        with patch.object(self.signatures, 'datetime_override', lambda: now):
+            key = self.signatures.write_key(scope='rotation_test', expiration=1, active=True)
+            unrelated_key = self.signatures.write_key(scope='other', expiration=1, active=True)
+            rotated_keys = self.signatures.rotate_keys(time_until=2, scope='rotation_test')
+            self.assertEqual(len(rotated_keys), 1)
+            old_key, new_key = rotated_keys[0]
+            self.assertEqual(old_key, key)
+            self.assertNotEqual(old_key, new_key)
+            self.assertTrue(self.signatures.get_key(old_key)['rotated'])
+            new_key_details = self.signatures.get_key(new_key)
+            self.assertEqual(new_key_details['previous_key'], old_key)
+            self.assertEqual(new_key_details['expiration'], now + timedelta(hours=1))
+            self.assertTrue(self.signatures.verify_key(signature=new_key, scope='rotation_test'))
+            self.assertTrue(self.signatures.get_key(unrelated_key)['active'])
 
     def test_rate_limiting(self):
         """Test rate limiting."""
@@ -55,30 +441,115 @@ class TestSignatures(unittest.TestCase):
         with self.assertRaises(RateLimitExceeded):
             self.signatures.verify_key(signature=key, scope='test')  # Third request should fail.
 
-    def test_key_scope_mismatch(self):
-        """Test verifying a key with a mismatched scope."""
-        key = self.signatures.write_key(scope='test1', active=True)
-        with self.assertRaises(ScopeMismatch):
-            self.signatures.verify_key(signature=key, scope='test2')
+    def test_rate_limiting_looks_up_by_hash(self):
+        """Test that the 'db' rate limiting backend reads keys by hash, and only their count columns."""
+        key = self.signatures.write_key(scope='test', active=True)
+        with capture_statements(self.engine) as statements:
+            self.assertTrue(self.signatures.verify_key(signature=key, scope='test'))
+        selects = [statement for statement in statements if statement.startswith('SELECT')]
+        self.assertEqual(len(selects), 2)
+        for statement in selects:
+            self.assertIn('signature_hash', statement.split('WHERE')[1])
+        self.assertNotIn('email', selects[0].split('FROM')[0])
+        self.assertEqual(len([statement for statement in statements if statement.startswith('UPDATE')]), 1)
 
-    def test_verify_nonexistent_key(self):
-        """Test verifying a non-existent key."""
-        with self.assertRaises(KeyDoesNotExist):
-            self.signatures.verify_key(signature='nonexistent_key', scope='test')
+        with self.signatures.Session() as session:
+            self.assertEqual(session.get(self.signatures.get_model(), key).request_count, 1)
 
-    def test_rotation_of_already_rotated_key(self):
-        """Test rotation of an already rotated key."""
+    def test_verify_keys(self):
+        """Test batch verification, including per-signature rate limits."""
         key = self.signatures.write_key(scope='test', active=True)
-        new_key = self.signatures.rotate_key(key=key)
-        with self.assertRaises(AlreadyRotated):
-            self.signatures.rotate_key(key=key)
+        other_key = self.signatures.write_key(scope='other', active=True)
+        results = self.signatures.verify_keys([key, key, key, other_key, 'nonexistent_key'], 'test')
+        self.assertEqual(results[:2], [True, True])
+        self.assertIsInstance(results[2], RateLimitExceeded)
+        self.assertIsInstance(results[3], ScopeMismatch)
+        self.assertIsInstance(results[4], KeyDoesNotExist)
+        # The batch's request counts are persisted, so the single-key path sees them too
+        with self.assertRaises(RateLimitExceeded):
+            self.signatures.verify_key(signature=key, scope='test')
+
+    def test_rate_limiting_memory_backend(self):
+        """Test rate limiting with request counts tracked in memory."""
+        signatures = memory_backend_signatures()
+        key = signatures.write_key(scope='test', active=True)
+
+        # Checking the limit must never write to the database
+        with capture_statements(signatures.engine) as statements:
+            signatures.verify_key(signature=key, scope='test')
+            signatures.verify_key(signature=key, scope='test')
+            with self.assertRaises(RateLimitExceeded):
+                signatures.verify_key(signature=key, scope='test')
+        self.assertFalse([statement for statement in statements if statement.startswith('UPDATE')])
+        self.assertEqual(len(signatures._counters[key]), 2)
+
+        signatures.flush_rate_limits()
+        with signatures.Session() as session:
+            self.assertEqual(session.get(signatures.get_model(), key).request_count, 2)
 
-    def test_rotation_of_inactive_key(self):
-        """Test attempting to rotate an inactive key."""
+    def test_rate_limiting_counter_without_database(self):
+        """Test the memory backend's counter logic with the database layer mocked out."""
+        signatures = memory_backend_signatures(max_requests=10)
+        signatures._counters['s'] = deque()
+
+        with capture_statements(signatures.engine) as statements, \
+                patch.object(signatures, 'check_key', return_value=True) as check_key:
+            for _ in range(10):
+                self.assertTrue(signatures.verify_key('s', 'some_scope'))
+            with self.assertRaises(RateLimitExceeded):
+                signatures.verify_key('s', 'some_scope')
+        self.assertEqual(check_key.call_count, 10)
+        self.assertEqual(statements, [])
+
+    def test_rate_limiting_memory_backend_window_slides(self):
+        """Test that the memory backend frees capacity as old requests leave the window."""
+        now_ns = [0]
+        signatures = memory_backend_signatures()
+        signatures._now_ns = lambda: now_ns[0]
+        key = signatures.write_key(scope='test', active=True)
+        for seconds, allowed in ((0, True), (5, True), (7, False), (11, True), (13, False), (16, True)):
+            now_ns[0] = seconds * 10**9
+            with self.subTest(seconds=seconds):
+                if allowed:
+                    self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+                else:
+                    with self.assertRaises(RateLimitExceeded):
+                        signatures.verify_key(signature=key, scope='test')
+
+    def test_rate_limiting_memory_backend_window_dropped_mid_request(self):
+        """Test that a window evicted or retired during a request is recovered without losing counts."""
+        for flush in (False, True):
+            with self.subTest(flush=flush):
+                signatures = memory_backend_signatures()
+                key = signatures.write_key(scope='test', active=True)
+                self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+
+                # Drop the window the first time the clock is read by the next request,
+                # either as an eviction, or as _retire_keys does, flushing its count first
+                clock = signatures._now_ns
+                dropped = []
+                def now_ns():
+                    if not dropped:
+                        dropped.append(signatures._counters.pop(key))
+                        if flush:
+                            signatures.flush_rate_limits()
+                    return clock()
+                signatures._now_ns = now_ns
+
+                self.assertTrue(signatures.verify_key(signature=key, scope='test'))
+                self.assertEqual(len(signatures._counters[key]), 2)
+                with self.assertRaises(RateLimitExceeded):
+                    signatures.verify_key(signature=key, scope='test')
+
+    def test_failed_rotation_rolls_back(self):
+        """Test that a failed rotation leaves the old key untouched."""
         key = self.signatures.write_key(scope='test', active=True)
-        self.signatures.expire_key(key)
-        with self.assertRaises(KeyExpired):
-            self.signatures.rotate_key(key=key)
+        with patch.object(self.signatures, '_write_key_in_session', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.signatures.rotate_key(key=key)
+        stored_key = self.signatures.get_key(key)
+        self.assertTrue(stored_key['active'])
+        self.assertFalse(stored_key['rotated'])
 
 if __name__ == '__main__':
     unittest.main()